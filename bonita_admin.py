@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Офлайн-обслуживание Bonita_Kani_Korso без Telegram (быстрый старт, можно из cron
+при работающем боте):
+    python bonita_admin.py stats [--days N] [--meals|--trends]
+    python bonita_admin.py compact [--days 120]   — очистка старых, дублей, сортировка
+    python bonita_admin.py verify                  — проверка лога, код выхода 1 при ошибках
+    python bonita_admin.py export [--format json|csv] [-o файл] [--days N]
+    python bonita_admin.py import файл [--format json|csv]
+Бот и CLI меняют лог только под общей блокировкой (flock на activity_log.json.lock),
+файл подменяется атомарно.
+"""
+import os, sys, json, csv, argparse
+from bonita_core import (
+    LOG_FILE, SETTINGS_FILE, default_settings, load_data, read_log, rewrite_log,
+    entry_problems, trim_old, get_stats, get_meal_stats, active_schedule,
+)
+
+CSV_FIELDS = ["time","action","note","user"]
+
+def dedupe_sorted(records):
+    seen=set(); out=[]
+    for e in sorted(records,key=lambda x:x["time"]):
+        key=json.dumps(e,sort_keys=True,ensure_ascii=False)
+        if key in seen: continue
+        seen.add(key); out.append(e)
+    return out
+
+# --- Команды ---
+def cmd_stats(args):
+    log=read_log()
+    settings=load_data(SETTINGS_FILE,default_settings)
+    sched=settings["schedule"]
+    if args.trends:
+        from bonita_trends import Trends
+        tr=Trends(); tr.update(log,active_schedule(settings))
+        print(tr.report())
+    elif args.meals:
+        print(get_meal_stats(log,args.days,sched))
+    else:
+        print(get_stats(log,args.days,sched))
+
+def cmd_compact(args):
+    n0=len(read_log())
+    new=rewrite_log(lambda log: dedupe_sorted(trim_old(log,days=args.days)))
+    print(f"✅ {LOG_FILE}: {n0} → {len(new)} записей")
+
+def cmd_verify(args):
+    try:
+        log=read_log()
+    except (json.JSONDecodeError,UnicodeDecodeError) as exc:
+        print(f"❌ {LOG_FILE}: не читается как JSON: {exc}")
+        return 1
+    if not isinstance(log,list):
+        print(f"❌ {LOG_FILE}: ожидался список записей")
+        return 1
+    errors=0
+    for i,e in enumerate(log):
+        for p in entry_problems(e):
+            print(f"❌ #{i}: {p}"); errors+=1
+    if errors:
+        print(f"Ошибок: {errors}")
+        return 1
+    # незакрытые/лишние сессии — не ошибка (бот держит сессию открытой), но стоит знать
+    open_={}; orphans=0
+    for e in sorted(log,key=lambda x:x["time"]):
+        key=(e["action"],e["user"])
+        if e.get("note")=="start": open_[key]=e["time"]
+        elif e.get("note")=="end" and open_.pop(key,None) is None: orphans+=1
+    dups=len(log)-len(dedupe_sorted(log))
+    print(f"✅ {LOG_FILE}: {len(log)} записей, открытых сессий {len(open_)}, "
+          f"концов без начала {orphans}, дублей {dups}")
+    for (act,uid),t in sorted(open_.items()):
+        print(f"  • {act} (user {uid}) с {t}")
+    return 0
+
+def cmd_export(args):
+    log=sorted(read_log(),key=lambda x:x["time"])
+    if args.days: log=trim_old(log,days=args.days)
+    out=open(args.output,"w",encoding="utf-8",newline="") if args.output else sys.stdout
+    try:
+        if args.format=="csv":
+            w=csv.DictWriter(out,fieldnames=CSV_FIELDS,extrasaction="ignore")
+            w.writeheader(); w.writerows(log)
+        else:
+            json.dump(log,out,ensure_ascii=False,indent=2); out.write("\n")
+    finally:
+        if out is not sys.stdout: out.close()
+
+def read_import(fn, fmt):
+    with open(fn,"r",encoding="utf-8",newline="") as f:
+        if fmt=="csv":
+            recs=[]
+            for row in csv.DictReader(f):
+                e={"action":row["action"],"time":row["time"],
+                   "user":int(row["user"]) if row.get("user","").lstrip("-").isdigit() else row.get("user")}
+                if row.get("note"): e["note"]=row["note"]
+                recs.append(e)
+            return recs
+        return json.load(f)
+
+def cmd_import(args):
+    fmt=args.format or ("csv" if args.file.lower().endswith(".csv") else "json")
+    recs=read_import(args.file,fmt)
+    if not isinstance(recs,list):
+        print(f"❌ {args.file}: ожидался список записей"); return 1
+    bad=[(i,p) for i,e in enumerate(recs) for p in entry_problems(e)]
+    for i,p in bad: print(f"❌ #{i}: {p}")
+    if bad:
+        print("Импорт отменён."); return 1
+    n0=len(read_log())
+    new=rewrite_log(lambda log: dedupe_sorted(log+recs))
+    print(f"✅ Импортировано {len(new)-n0} новых записей ({len(recs)} в файле)")
+    return 0
+
+def build_parser():
+    ap=argparse.ArgumentParser(prog="bonita_admin",description="Офлайн-обслуживание лога Bonita_Kani_Korso")
+    ap.add_argument("-C","--dir",default=".",help="папка бота (где лежит activity_log.json)")
+    sub=ap.add_subparsers(dest="cmd",required=True)
+    p=sub.add_parser("stats",help="статистика как в боте")
+    p.add_argument("--days",type=int,default=2)
+    g=p.add_mutually_exclusive_group()
+    g.add_argument("--meals",action="store_true",help="до фактического приёма пищи")
+    g.add_argument("--trends",action="store_true",help="тренды 1/7/30 дней")
+    p.set_defaults(func=cmd_stats)
+    p=sub.add_parser("compact",help="удалить старые записи и дубли, отсортировать")
+    p.add_argument("--days",type=int,default=120)
+    p.set_defaults(func=cmd_compact)
+    p=sub.add_parser("verify",help="проверить лог")
+    p.set_defaults(func=cmd_verify)
+    p=sub.add_parser("export",help="выгрузить лог")
+    p.add_argument("--format",choices=("json","csv"),default="json")
+    p.add_argument("-o","--output")
+    p.add_argument("--days",type=int)
+    p.set_defaults(func=cmd_export)
+    p=sub.add_parser("import",help="добавить записи из файла (с проверкой и без дублей)")
+    p.add_argument("file")
+    p.add_argument("--format",choices=("json","csv"))
+    p.set_defaults(func=cmd_import)
+    return ap
+
+def main(argv=None):
+    args=build_parser().parse_args(argv)
+    os.chdir(args.dir)
+    return args.func(args) or 0
+
+if __name__=="__main__":
+    sys.exit(main())
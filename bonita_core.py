@@ -0,0 +1,327 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Ядро Bonita_Kani_Korso без Telegram: файлы, лог, статистика.
+Используется ботом (bonita_kani_korso.py) и офлайн-CLI (bonita_admin.py).
+Никаких побочных эффектов при импорте: настройки и лог читаются явно.
+"""
+import os, json, statistics
+from bisect import bisect_left
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+# --- Файлы ---
+LOG_FILE      = "activity_log.json"
+SETTINGS_FILE = "settings.json"
+COMMANDS_FILE = "commands.json"
+
+# --- Списки действий и эмодзи ---
+ALL_ACTIONS = [
+    "Сон","Еда","Игры","Прогулка","Био-прогулка",
+    "Туалет (какашки)","Туалет (мочи)"
+]
+VALID_ACTIONS = [
+    ("🛌","Сон"),("🍽️","Еда"),("🌿","Игры"),
+    ("🌳","Прогулка"),("🧻","Био-прогулка"),
+    ("💩","Туалет (какашки)"),("🚰","Туалет (мочи)")
+]
+EMOJI_BY_ACTION = {act:emo for emo,act in VALID_ACTIONS}
+SESSION_ACTIONS = ("Сон","Прогулка","Игры")  # toggle start/end
+
+# --- Настройки по умолчанию ---
+default_settings = {
+    "feedings_per_day":1,
+    "schedule":{
+        "breakfast":"08:00","lunch":"13:00",
+        "dinner":"18:00","late_dinner":"23:00"
+    }
+}
+
+MEAL_ORDER = ["breakfast","lunch","dinner","late_dinner"]
+
+def active_schedule(settings):
+    """Только те приёмы пищи, что реально назначены (первые feedings_per_day)."""
+    sched=settings["schedule"]
+    return {k:sched[k] for k in MEAL_ORDER[:settings.get("feedings_per_day",1)] if k in sched}
+
+# --- Загрузка/сохранение данных ---
+def load_data(fn, default):
+    if os.path.exists(fn):
+        try:
+            with open(fn,"r",encoding="utf-8") as f: return json.load(f)
+        except json.JSONDecodeError: return default
+    return default
+
+# Межпроцессная блокировка (бот ↔ bonita_admin): flock на «<файл>.lock».
+# Реентерабельна внутри процесса, чтобы save_data работал и под append_log/rewrite_log.
+# Внутри блокировки не должно быть await — иначе другие апдейты бота её «разделят».
+try:
+    import fcntl
+except ImportError:  # Windows: блокировки нет, только атомарная подмена файла
+    fcntl = None
+
+_locks = {}  # fn -> [файл блокировки, глубина]
+
+@contextmanager
+def file_lock(fn):
+    held=_locks.get(fn)
+    if held:
+        held[1]+=1
+    else:
+        f=open(f"{fn}.lock","a")
+        if fcntl: fcntl.flock(f,fcntl.LOCK_EX)
+        held=_locks[fn]=[f,1]
+    try:
+        yield
+    finally:
+        held[1]-=1
+        if not held[1]:
+            del _locks[fn]
+            if fcntl: fcntl.flock(held[0],fcntl.LOCK_UN)
+            held[0].close()
+
+def save_data(fn, data):
+    # пишем во временный файл и подменяем: читатель никогда не видит файл наполовину
+    with file_lock(fn):
+        tmp=f"{fn}.tmp{os.getpid()}"
+        with open(tmp,"w",encoding="utf-8") as f: json.dump(data,f,ensure_ascii=False,indent=2)
+        os.replace(tmp,fn)
+
+def read_log(fn=LOG_FILE):
+    """Как load_data, но битый файл — ошибка, а не пустой лог (чтобы не затереть его)."""
+    if not os.path.exists(fn): return []
+    with open(fn,"r",encoding="utf-8") as f: return json.load(f)
+
+# Поколение лога («<файл>.gen») растёт при любой перезаписи, кроме дописывания в конец.
+# Кэши (LogCursor) сравнивают его и пересобираются после правок, import и compact.
+# Читать поколение нужно ДО загрузки лога: тогда гонка даёт лишнюю пересборку, а не пропуск.
+def log_generation(fn=LOG_FILE):
+    try:
+        with open(f"{fn}.gen","r") as f: return int(f.read().strip() or 0)
+    except (FileNotFoundError,ValueError): return 0
+
+def rewrite_log(transform, fn=LOG_FILE, append_only=False):
+    """load → transform → save под блокировкой лога. Возвращает новый лог."""
+    with file_lock(fn):
+        new=transform(read_log(fn))
+        save_data(fn,new)
+        if not append_only:
+            tmp=f"{fn}.gen.tmp{os.getpid()}"
+            with open(tmp,"w") as f: f.write(str(log_generation(fn)+1))
+            os.replace(tmp,f"{fn}.gen")
+    return new
+
+def append_log(*entries, fn=LOG_FILE):
+    """Дописать записи (с очисткой старых) под блокировкой. Возвращает новый лог.
+    Срезанное начало лога курсоры переживают, поэтому поколение не меняется."""
+    return rewrite_log(lambda log: trim_old(log+list(entries)),fn,append_only=True)
+
+# --- Курсор по логу ---
+class LogCursor:
+    """Помнит последнюю обработанную запись и отдаёт только дописанный хвост лога."""
+    def __init__(self):
+        self.tail=None; self.last=""; self.gen=None
+
+    def fresh(self, log, gen=0):
+        """Новые записи или None, если лог изменён не дописыванием (нужна пересборка).
+        gen — log_generation(), прочитанное до загрузки лога.
+        Срезанное trim_old начало лога пересборки не требует."""
+        if self.tail is None or gen!=self.gen: return None
+        for i in range(len(log)-1,-1,-1):
+            if log[i]==self.tail: break
+            if log[i]["time"]<self.last: return None
+        else:
+            return None
+        new=log[i+1:]
+        if any(new[j]["time"]>new[j+1]["time"] for j in range(len(new)-1)): return None
+        return new
+
+    def advance(self, log, fed, gen=0):
+        self.tail=dict(log[-1]) if log else None
+        self.last=max([self.last]+[e["time"] for e in fed])
+        self.gen=gen
+
+    def reset(self):
+        self.tail=None; self.last=""; self.gen=None
+
+# --- Проверка записей ---
+NOTES_BY_ACTION = {
+    "Туалет (какашки)":(None,"outside","home-pad","home-miss"),
+    "Туалет (мочи)":(None,"outside","home-pad","home-miss"),
+    "Еда":(None,),
+}
+
+def entry_problems(e):
+    """Список проблем одной записи лога (пустой — запись корректна)."""
+    if not isinstance(e,dict): return ["не объект"]
+    res=[]
+    if e.get("action") not in ALL_ACTIONS: res.append(f"неизвестное действие {e.get('action')!r}")
+    try:
+        datetime.strptime(e.get("time",""),"%Y-%m-%d %H:%M:%S")
+    except (TypeError,ValueError):
+        res.append(f"неверное время {e.get('time')!r}")
+    if not isinstance(e.get("user"),int): res.append(f"неверный user {e.get('user')!r}")
+    notes=NOTES_BY_ACTION.get(e.get("action"),(None,"start","end"))
+    if e.get("note") not in notes: res.append(f"неверная отметка {e.get('note')!r}")
+    return res
+
+# --- Ротация / очистка ---
+def trim_old(records, days=120):
+    cut = datetime.now() - timedelta(days=days)
+    return [e for e in records if datetime.strptime(e["time"],"%Y-%m-%d %H:%M:%S")>=cut]
+
+def check_rotation():
+    if os.path.exists(LOG_FILE) and os.path.getsize(LOG_FILE)>10*1024*1024:
+        rewrite_log(lambda log: trim_old(log,days=20))
+
+# --- Утилиты времени ---
+def average_time(times):
+    if not times: return "—"
+    tot=sum(dt.hour*60+dt.minute for dt in (datetime.strptime(t,"%Y-%m-%d %H:%M:%S") for t in times))
+    avg=tot//len(times)
+    return f"{avg//60:02d}:{avg%60:02d}"
+
+def average_duration(mins_list):
+    if not mins_list: return "—"
+    avg=sum(mins_list)/len(mins_list)
+    h=int(avg)//60; m=int(avg)%60
+    return f"{h}ч {m}м"
+
+def list_last_entries(log, action, limit=10):
+    ents=[e for e in log if e["action"]==action]
+    ents.sort(key=lambda x:x["time"],reverse=True)
+    return ents[:limit]
+
+def extract_durations(log, action):
+    pairs=[]; start=None
+    for e in sorted(log,key=lambda x:x["time"]):
+        if e["action"]==action and e.get("note")=="start":
+            start=datetime.strptime(e["time"],"%Y-%m-%d %H:%M:%S")
+        elif e["action"]==action and e.get("note")=="end" and start:
+            end=datetime.strptime(e["time"],"%Y-%m-%d %H:%M:%S")
+            mins=int((end-start).total_seconds()/60)
+            pairs.append((mins,end.time()))
+            start=None
+    return pairs
+
+# --- Статистика ---
+MEAL_PERIODS=[("breakfast","Завтрак"),("lunch","Обед"),("dinner","Ужин"),("late_dinner","Поздний ужин")]
+
+def meal_slot(t, sch_t):
+    if t<sch_t["lunch"]: return "breakfast"
+    if t<sch_t["dinner"]: return "lunch"
+    if t<sch_t["late_dinner"]: return "dinner"
+    return "late_dinner"
+
+def get_stats(log, days, sched):
+    cut=datetime.now()-timedelta(days=days)
+    ent=[e for e in log if datetime.strptime(e["time"],"%Y-%m-%d %H:%M:%S")>=cut]
+    sch_t={k:datetime.strptime(v,"%H:%M").time() for k,v in sched.items()}
+    periods=MEAL_PERIODS
+    lines=[f"📊 Статистика за {days} дней:"]
+
+    # Еда
+    food={p:[] for p,_ in periods}
+    for e in ent:
+        if e["action"]!="Еда": continue
+        t=datetime.strptime(e["time"],"%Y-%m-%d %H:%M:%S").time()
+        food[meal_slot(t,sch_t)].append(e["time"])
+    lines.append("\n🍽️ Еда:")
+    for p,label in periods:
+        lines.append(f"  • {label}: {len(food[p])} раз, ср. в {average_time(food[p])}")
+
+    # Сон и Прогулка
+    for act,emoji in [("Сон","🛌"),("Прогулка","🌳")]:
+        pairs=extract_durations(ent,act)
+        grp={p:[] for p,_ in periods}
+        for mins,tt in pairs:
+            grp[meal_slot(tt,sch_t)].append(mins)
+        lines.append(f"\n{emoji} {act}-до-приёма:")
+        for p,label in periods:
+            arr=grp[p]
+            lines.append(f"  • {label}: {len(arr)} раз, ср. длительность {average_duration(arr)}")
+
+    # Игры и Туалет
+    for act,emoji in [("Игры","🌿"),("Туалет (какашки)","💩"),("Туалет (мочи)","🚰")]:
+        grp={p:[] for p,_ in periods}
+        for e in ent:
+            if e["action"]!=act: continue
+            t=datetime.strptime(e["time"],"%Y-%m-%d %H:%M:%S").time()
+            grp[meal_slot(t,sch_t)].append(e["time"])
+        lines.append(f"\n{emoji} {act}-до-приёма:")
+        for p,label in periods:
+            lines.append(f"  • {label}: {len(grp[p])} раз, ср. в {average_time(grp[p])}")
+
+    return "\n".join(lines)
+
+# --- Статистика по фактическим приёмам пищи ---
+# Каждое событие/сессия привязывается к следующей реальной «Еде» слиянием
+# упорядоченных по времени потоков. Результат держится в meal_join и
+# дополняется только хвостом лога (LogCursor); полная пересборка — если лог
+# изменён не дописыванием (удаление, правка, запись постфактум в прошлое,
+# import/compact — по поколению лога) или поменялось расписание.
+MEAL_JOIN_ACTIONS = [("Сон","🛌"),("Прогулка","🌳"),("Игры","🌿"),("Туалет (какашки)","💩"),("Туалет (мочи)","🚰")]
+meal_join = {}
+
+def reset_meal_join():
+    meal_join.clear()
+    meal_join.update({
+        "cursor":LogCursor(),"sched":None,
+        "open":{},     # (user, action) -> datetime начала незакрытой сессии
+        "pending":[],  # (action, datetime) — ждут следующей еды
+        "times":[],    # время еды для каждой строки rows (для bisect)
+        "rows":[],     # (slot, action, минут до еды)
+    })
+
+reset_meal_join()
+
+def _meal_join_feed(e, sch_t):
+    t=datetime.strptime(e["time"],"%Y-%m-%d %H:%M:%S")
+    act=e["action"]; note=e.get("note")
+    if act=="Еда":
+        slot=meal_slot(t.time(),sch_t)
+        for a,t0 in meal_join["pending"]:
+            meal_join["times"].append(t)
+            meal_join["rows"].append((slot,a,int((t-t0).total_seconds()//60)))
+        meal_join["pending"]=[]
+    elif act in SESSION_ACTIONS and note=="start":
+        meal_join["open"][(e.get("user"),act)]=t
+    elif act in SESSION_ACTIONS and note=="end":
+        if meal_join["open"].pop((e.get("user"),act),None) is not None:
+            meal_join["pending"].append((act,t))
+    elif act in EMOJI_BY_ACTION and act!="Био-прогулка":
+        meal_join["pending"].append((act,t))
+
+def update_meal_join(log, sched, gen=0):
+    sch_t={k:datetime.strptime(v,"%H:%M").time() for k,v in sched.items()}
+    fresh=meal_join["cursor"].fresh(log,gen)
+    if fresh is None or meal_join["sched"]!=sched:
+        reset_meal_join()
+        meal_join["sched"]=dict(sched)
+        fresh=sorted(log,key=lambda x:x["time"])
+    for e in fresh:
+        _meal_join_feed(e,sch_t)
+    meal_join["cursor"].advance(log,fresh,gen)
+
+def minutes_distribution(arr):
+    if not arr: return "—"
+    med=statistics.median(arr)
+    if len(arr)<2: return f"медиана {med:.0f} мин"
+    # inclusive: квартили не выходят за пределы наблюдений (exclusive даёт <0 мин на малых выборках)
+    q1,_,q3=statistics.quantiles(arr,n=4,method="inclusive")
+    return f"медиана {med:.0f} мин (25–75%: {q1:.0f}–{q3:.0f}, макс {max(arr)})"
+
+def get_meal_stats(log, days, sched, gen=0):
+    update_meal_join(log, sched, gen)
+    cut=datetime.now()-timedelta(days=days)
+    i=bisect_left(meal_join["times"],cut)
+    grp={}
+    for slot,act,mins in meal_join["rows"][i:]:
+        grp.setdefault((act,slot),[]).append(mins)
+    lines=[f"🍽️ До фактического приёма пищи за {days} дней:"]
+    for act,emoji in MEAL_JOIN_ACTIONS:
+        lines.append(f"\n{emoji} {act}:")
+        for p,label in MEAL_PERIODS:
+            arr=grp.get((act,p),[])
+            lines.append(f"  • {label}: {len(arr)} раз, {minutes_distribution(arr)}")
+    return "\n".join(lines)
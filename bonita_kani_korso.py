@@ -11,42 +11,35 @@ Bonita_Kani_Korso — Telegram-бот для режима щенка:
     • Еда — по расписанию (завтрак/обед/ужин/поздний ужин)
     • Сон, Прогулка — «до приёма пищи»: кол-во + ср. длительность
     • Игры, Туалет — «до приёма пищи»: кол-во + ср. время регистрации
+    • 🍽️-режим: минуты до фактической следующей «Еды» (медиана, квартили)
+- 📈 Тренды за 1/7/30 дней (bonita_trends): туалет улица/пеленка/мимо, сон в сутки,
+  сдвиг кормлений от расписания + алерт, если доля «мимо» выросла вдвое за неделю
 - Интерактивный вывод последних 2/5/10/15 записей
 - CRUD выученных команд
 - Настройки: расписание + кол-во приёмов пищи
 - Напоминания: еда за 5 мин, прогулка за 1 ч 10 мин, био-выход через 4 мин
 - Бэкапы (23:59), ротация (>10 МБ), очистка (>120 дн)
 - Многопользовательская работа через .env
+Логика без Telegram — в bonita_core / bonita_trends; офлайн-CLI — bonita_admin.py
 """
-import os, json
+import os
 from datetime import datetime, date, timedelta, time
 from dotenv import load_dotenv
 from telegram import Update, ReplyKeyboardMarkup, KeyboardButton
 from telegram.ext import ApplicationBuilder, CommandHandler, MessageHandler, filters, ContextTypes
 from zoneinfo import ZoneInfo
+from bonita_trends import Trends
+from bonita_core import (
+    LOG_FILE, SETTINGS_FILE, COMMANDS_FILE, ALL_ACTIONS, default_settings,
+    load_data, save_data, append_log, rewrite_log, trim_old, check_rotation, list_last_entries,
+    get_stats, get_meal_stats, active_schedule, log_generation,
+)
 
 # --- Конфигурация ---
 load_dotenv()
 BOT_TOKEN        = os.getenv("TELEGRAM_BOT_TOKEN")
 ALLOWED_USER_IDS = [int(x) for x in os.getenv("ALLOWED_USER_IDS","").split(",") if x.strip().isdigit()]
 
-# --- Файлы ---
-LOG_FILE      = "activity_log.json"
-SETTINGS_FILE = "settings.json"
-COMMANDS_FILE = "commands.json"
-
-# --- Списки действий и эмодзи ---
-ALL_ACTIONS = [
-    "Сон","Еда","Игры","Прогулка","Био-прогулка",
-    "Туалет (какашки)","Туалет (мочи)"
-]
-VALID_ACTIONS = [
-    ("🛌","Сон"),("🍽️","Еда"),("🌿","Игры"),
-    ("🌳","Прогулка"),("🧻","Био-прогулка"),
-    ("💩","Туалет (какашки)"),("🚰","Туалет (мочи)")
-]
-EMOJI_BY_ACTION = {act:emo for emo,act in VALID_ACTIONS}
-
 # --- Кнопочные меню ---
 CANCEL = "❌ Отмена"
 MAIN_MENU = ReplyKeyboardMarkup([
@@ -56,44 +49,14 @@ MAIN_MENU = ReplyKeyboardMarkup([
     ["💩 Туалет (какашки)","🚰 Туалет (мочи)","🕓 Последние"],
     ["💬 Команды","📦 Резервная копия",CANCEL]
 ], resize_keyboard=True)
-STATS_CHOICES = ReplyKeyboardMarkup([[KeyboardButton("2 дня")],[KeyboardButton("5 дней")],[KeyboardButton("10 дней")],[KeyboardButton(CANCEL)]], resize_keyboard=True)
+STATS_CHOICES = ReplyKeyboardMarkup([[KeyboardButton(x),KeyboardButton("🍽️ "+x)] for x in ("2 дня","5 дней","10 дней")] + [[KeyboardButton("📈 Тренды")],[KeyboardButton(CANCEL)]], resize_keyboard=True)
 LAST_CHOICES  = ReplyKeyboardMarkup([[KeyboardButton(x)] for x in ("2","5","10","15")] + [[KeyboardButton(CANCEL)]], resize_keyboard=True)
 CMD_MENU      = ReplyKeyboardMarkup([["Просмотр","Добавить"],["Редактировать","Удалить"],[CANCEL]], resize_keyboard=True)
 SETT_MENU     = ReplyKeyboardMarkup([["Изменить расписание","Изменить кол-во приёмов пищи"],[CANCEL]], resize_keyboard=True)
 
-# --- Настройки по умолчанию ---
-default_settings = {
-    "feedings_per_day":1,
-    "schedule":{
-        "breakfast":"08:00","lunch":"13:00",
-        "dinner":"18:00","late_dinner":"23:00"
-    }
-}
-
-# --- Загрузка/сохранение данных ---
-def load_data(fn, default):
-    if os.path.exists(fn):
-        try:
-            with open(fn,"r",encoding="utf-8") as f: return json.load(f)
-        except json.JSONDecodeError: return default
-    return default
-
-def save_data(fn, data):
-    with open(fn,"w",encoding="utf-8") as f: json.dump(data,f,ensure_ascii=False,indent=2)
-
 settings = load_data(SETTINGS_FILE, default_settings)
 commands = load_data(COMMANDS_FILE, [])
 
-# --- Ротация / очистка ---
-def trim_old(records, days=120):
-    cut = datetime.now() - timedelta(days=days)
-    return [e for e in records if datetime.strptime(e["time"],"%Y-%m-%d %H:%M:%S")>=cut]
-
-def check_rotation():
-    if os.path.exists(LOG_FILE) and os.path.getsize(LOG_FILE)>10*1024*1024:
-        log = load_data(LOG_FILE, [])
-        save_data(LOG_FILE, trim_old(log,days=20))
-
 # --- Состояния и активные сессии ---
 user_states   = {}  # user_id -> {mode,step,data}
 active_sleeps = {}  # user_id -> {"start":...}
@@ -101,87 +64,12 @@ active_walks  = {}
 active_games  = {}
 active_bios   = {}
 
-# --- Утилиты времени ---
-def average_time(times):
-    if not times: return "—"
-    tot=sum(dt.hour*60+dt.minute for dt in (datetime.strptime(t,"%Y-%m-%d %H:%M:%S") for t in times))
-    avg=tot//len(times)
-    return f"{avg//60:02d}:{avg%60:02d}"
-
-def average_duration(mins_list):
-    if not mins_list: return "—"
-    avg=sum(mins_list)/len(mins_list)
-    h=int(avg)//60; m=int(avg)%60
-    return f"{h}ч {m}м"
-
-def list_last_entries(log, action, limit=10):
-    ents=[e for e in log if e["action"]==action]
-    ents.sort(key=lambda x:x["time"],reverse=True)
-    return ents[:limit]
-
-def extract_durations(log, action):
-    pairs=[]; start=None
-    for e in sorted(log,key=lambda x:x["time"]):
-        if e["action"]==action and e.get("note")=="start":
-            start=datetime.strptime(e["time"],"%Y-%m-%d %H:%M:%S")
-        elif e["action"]==action and e.get("note")=="end" and start:
-            end=datetime.strptime(e["time"],"%Y-%m-%d %H:%M:%S")
-            mins=int((end-start).total_seconds()/60)
-            pairs.append((mins,end.time()))
-            start=None
-    return pairs
-
-# --- Статистика ---
-def get_stats(log, days=2):
-    cut=datetime.now()-timedelta(days=days)
-    ent=[e for e in log if datetime.strptime(e["time"],"%Y-%m-%d %H:%M:%S")>=cut]
-    sched=settings["schedule"]
-    sch_t={k:datetime.strptime(v,"%H:%M").time() for k,v in sched.items()}
-    periods=[("breakfast","Завтрак"),("lunch","Обед"),("dinner","Ужин"),("late_dinner","Поздний ужин")]
-    lines=[f"📊 Статистика за {days} дней:"]
+# --- Тренды ---
+trends = Trends()
 
-    # Еда
-    food={p:[] for p,_ in periods}
-    for e in ent:
-        if e["action"]!="Еда": continue
-        t=datetime.strptime(e["time"],"%Y-%m-%d %H:%M:%S").time()
-        if t<sch_t["lunch"]: food["breakfast"].append(e["time"])
-        elif t<sch_t["dinner"]: food["lunch"].append(e["time"])
-        elif t<sch_t["late_dinner"]: food["dinner"].append(e["time"])
-        else: food["late_dinner"].append(e["time"])
-    lines.append("\n🍽️ Еда:")
-    for p,label in periods:
-        lines.append(f"  • {label}: {len(food[p])} раз, ср. в {average_time(food[p])}")
-
-    # Сон и Прогулка
-    for act,emoji in [("Сон","🛌"),("Прогулка","🌳")]:
-        pairs=extract_durations(ent,act)
-        grp={p:[] for p,_ in periods}
-        for mins,tt in pairs:
-            if tt<sch_t["lunch"]: grp["breakfast"].append(mins)
-            elif tt<sch_t["dinner"]: grp["lunch"].append(mins)
-            elif tt<sch_t["late_dinner"]: grp["dinner"].append(mins)
-            else: grp["late_dinner"].append(mins)
-        lines.append(f"\n{emoji} {act}-до-приёма:")
-        for p,label in periods:
-            arr=grp[p]
-            lines.append(f"  • {label}: {len(arr)} раз, ср. длительность {average_duration(arr)}")
-
-    # Игры и Туалет
-    for act,emoji in [("Игры","🌿"),("Туалет (какашки)","💩"),("Туалет (мочи)","🚰")]:
-        grp={p:[] for p,_ in periods}
-        for e in ent:
-            if e["action"]!=act: continue
-            t=datetime.strptime(e["time"],"%Y-%m-%d %H:%M:%S").time()
-            if t<sch_t["lunch"]: grp["breakfast"].append(e["time"])
-            elif t<sch_t["dinner"]: grp["lunch"].append(e["time"])
-            elif t<sch_t["late_dinner"]: grp["dinner"].append(e["time"])
-            else: grp["late_dinner"].append(e["time"])
-        lines.append(f"\n{emoji} {act}-до-приёма:")
-        for p,label in periods:
-            lines.append(f"  • {label}: {len(grp[p])} раз, ср. в {average_time(grp[p])}")
-
-    return "\n".join(lines)
+def get_trends(log, gen):
+    trends.update(log, active_schedule(settings), gen)
+    return trends.report()
 
 # --- Напоминания ---
 async def send_backup(context:ContextTypes.DEFAULT_TYPE):
@@ -202,6 +90,12 @@ async def send_bio_reminder(context:ContextTypes.DEFAULT_TYPE):
     uid=context.job.data["user_id"]
     await context.bot.send_message(uid,"🧻 Напоминание: био-выход через 4 мин после еды.")
 
+async def send_trend_alerts(context:ContextTypes.DEFAULT_TYPE, log, gen):
+    trends.update(log, active_schedule(settings), gen)
+    for msg in trends.alerts():
+        for uid in ALLOWED_USER_IDS:
+            await context.bot.send_message(uid,msg)
+
 # --- Хендлеры ---
 async def start(update:Update, context:ContextTypes.DEFAULT_TYPE):
     uid=update.effective_user.id
@@ -215,6 +109,7 @@ async def handle_message(update:Update, context:ContextTypes.DEFAULT_TYPE):
         return await update.message.reply_text("⛔️ Доступ запрещён.")
     text=update.message.text.strip()
     now_str=datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    log_gen=log_generation()  # до загрузки лога — см. bonita_core.log_generation
     log=load_data(LOG_FILE,[])
 
     # Отмена
@@ -232,9 +127,9 @@ async def handle_message(update:Update, context:ContextTypes.DEFAULT_TYPE):
         st=user_states[uid]; step=st["step"]; data=st["data"]
         if step==0:
             if text=="Улица":
-                log.append({"action":data["action"],"time":now_str,"user":uid,"note":"outside"})
-                save_data(LOG_FILE,trim_old(log)); user_states.pop(uid)
-                return await update.message.reply_text(f"✅ {data['action']} на улице.",reply_markup=MAIN_MENU)
+                log=append_log({"action":data["action"],"time":now_str,"user":uid,"note":"outside"}); user_states.pop(uid)
+                await update.message.reply_text(f"✅ {data['action']} на улице.",reply_markup=MAIN_MENU)
+                return await send_trend_alerts(context,log,log_gen)
             if text=="Дом":
                 st["step"]=1
                 kb=[[KeyboardButton("Пеленка")],[KeyboardButton("Мимо")],[KeyboardButton(CANCEL)]]
@@ -243,9 +138,9 @@ async def handle_message(update:Update, context:ContextTypes.DEFAULT_TYPE):
             return await update.message.reply_text("❌ Отмена.",reply_markup=MAIN_MENU)
         if step==1:
             note="home-pad" if text=="Пеленка" else "home-miss"
-            log.append({"action":data["action"],"time":now_str,"user":uid,"note":note})
-            save_data(LOG_FILE,trim_old(log)); user_states.pop(uid)
-            return await update.message.reply_text(f"✅ {data['action']} дома: {text.lower()}.",reply_markup=MAIN_MENU)
+            log=append_log({"action":data["action"],"time":now_str,"user":uid,"note":note}); user_states.pop(uid)
+            await update.message.reply_text(f"✅ {data['action']} дома: {text.lower()}.",reply_markup=MAIN_MENU)
+            return await send_trend_alerts(context,log,log_gen)
     if text == "🛌 Сон":
         # загружаем лог
         log = load_data(LOG_FILE, [])
@@ -265,13 +160,12 @@ async def handle_message(update:Update, context:ContextTypes.DEFAULT_TYPE):
         if starts:
             # закрываем последний незакрытый старт
             last_start = sorted(starts, key=lambda e: e["time"])[-1]
-            log.append({
+            log = append_log({
                 "action": "Сон",
                 "time": now_str,
                 "user": uid,
                 "note": "end"
             })
-            save_data(LOG_FILE, trim_old(log))
             # рассчитываем длительность для вывода
             dt0 = datetime.strptime(last_start["time"], "%Y-%m-%d %H:%M:%S")
             dt1 = datetime.strptime(now_str, "%Y-%m-%d %H:%M:%S")
@@ -283,13 +177,12 @@ async def handle_message(update:Update, context:ContextTypes.DEFAULT_TYPE):
             )
         else:
             # создаём новую запись старта
-            log.append({
+            log = append_log({
                 "action": "Сон",
                 "time": now_str,
                 "user": uid,
                 "note": "start"
             })
-            save_data(LOG_FILE, trim_old(log))
             return await update.message.reply_text(
                 "😴 Сон начат.",
                 reply_markup=MAIN_MENU
@@ -312,8 +205,7 @@ async def handle_message(update:Update, context:ContextTypes.DEFAULT_TYPE):
         ]
         if starts:
             last_start = sorted(starts, key=lambda e: e["time"])[-1]
-            log.append({"action":"Прогулка","time":now_str,"user":uid,"note":"end"})
-            save_data(LOG_FILE, trim_old(log))
+            log = append_log({"action":"Прогулка","time":now_str,"user":uid,"note":"end"})
             dt0 = datetime.strptime(last_start["time"], "%Y-%m-%d %H:%M:%S")
             dt1 = datetime.strptime(now_str, "%Y-%m-%d %H:%M:%S")
             delta = dt1 - dt0
@@ -323,8 +215,7 @@ async def handle_message(update:Update, context:ContextTypes.DEFAULT_TYPE):
                 reply_markup=MAIN_MENU
             )
         else:
-            log.append({"action":"Прогулка","time":now_str,"user":uid,"note":"start"})
-            save_data(LOG_FILE, trim_old(log))
+            log = append_log({"action":"Прогулка","time":now_str,"user":uid,"note":"start"})
             return await update.message.reply_text(
                 "🚶 Прогулка начата.",
                 reply_markup=MAIN_MENU
@@ -347,8 +238,7 @@ async def handle_message(update:Update, context:ContextTypes.DEFAULT_TYPE):
         ]
         if starts:
             last_start = sorted(starts, key=lambda e: e["time"])[-1]
-            log.append({"action":"Игры","time":now_str,"user":uid,"note":"end"})
-            save_data(LOG_FILE, trim_old(log))
+            log = append_log({"action":"Игры","time":now_str,"user":uid,"note":"end"})
             dt0 = datetime.strptime(last_start["time"], "%Y-%m-%d %H:%M:%S")
             dt1 = datetime.strptime(now_str, "%Y-%m-%d %H:%M:%S")
             delta = dt1 - dt0
@@ -358,8 +248,7 @@ async def handle_message(update:Update, context:ContextTypes.DEFAULT_TYPE):
                 reply_markup=MAIN_MENU
             )
         else:
-            log.append({"action":"Игры","time":now_str,"user":uid,"note":"start"})
-            save_data(LOG_FILE, trim_old(log))
+            log = append_log({"action":"Игры","time":now_str,"user":uid,"note":"start"})
             return await update.message.reply_text(
                 "🌿 Игры начаты.",
                 reply_markup=MAIN_MENU
@@ -368,12 +257,11 @@ async def handle_message(update:Update, context:ContextTypes.DEFAULT_TYPE):
     # Био-прогулка toggle
     if text=="🧻 Био-прогулка":
         check_rotation()
-        log.append({
+        log = append_log({
             "action": "Био-прогулка",
             "time": now_str,
             "user": uid
         })
-        save_data(LOG_FILE, trim_old(log))
         return await update.message.reply_text(
             "🧻 Био-прогулка записана.",
             reply_markup=MAIN_MENU
@@ -382,8 +270,7 @@ async def handle_message(update:Update, context:ContextTypes.DEFAULT_TYPE):
     # Еда
     if text=="🍽️ Еда":
         check_rotation()
-        log.append({"action":"Еда","time":now_str,"user":uid})
-        save_data(LOG_FILE,trim_old(log))
+        log = append_log({"action":"Еда","time":now_str,"user":uid})
         context.job_queue.run_once(send_bio_reminder, when=4*60, data={"user_id":uid})
         return await update.message.reply_text("🍽️ Еда записана.",reply_markup=MAIN_MENU)
 
@@ -432,12 +319,11 @@ async def handle_message(update:Update, context:ContextTypes.DEFAULT_TYPE):
                     reply_markup=ReplyKeyboardMarkup([[KeyboardButton(CANCEL)]], resize_keyboard=True)
                 )
             # Еда, Игры, Туалет
-            log.append({
+            log = append_log({
                 "action": action,
                 "time": dt0.strftime("%Y-%m-%d %H:%M:%S"),
                 "user": uid
             })
-            save_data(LOG_FILE, trim_old(log))
             user_states.pop(uid)
             return await update.message.reply_text("✅ Записано.", reply_markup=MAIN_MENU)
 
@@ -448,11 +334,10 @@ async def handle_message(update:Update, context:ContextTypes.DEFAULT_TYPE):
             except ValueError:
                 return await update.message.reply_text("Неверный формат.")
             dt0 = data["start"]
-            log.extend([
+            log = append_log(
                 {"action": "Сон", "time": dt0.strftime("%Y-%m-%d %H:%M:%S"), "user": uid, "note": "start"},
                 {"action": "Сон", "time": dt1.strftime("%Y-%m-%d %H:%M:%S"), "user": uid, "note": "end"},
-            ])
-            save_data(LOG_FILE, trim_old(log))
+            )
             user_states.pop(uid)
             return await update.message.reply_text("✅ Сон записан.", reply_markup=MAIN_MENU)
 
@@ -464,11 +349,10 @@ async def handle_message(update:Update, context:ContextTypes.DEFAULT_TYPE):
                 return await update.message.reply_text("Нужно число минут.")
             dt0 = data["start"]
             dt1 = dt0 + timedelta(minutes=mins)
-            log.extend([
+            log = append_log(
                 {"action": data["action"], "time": dt0.strftime("%Y-%m-%d %H:%M:%S"), "user": uid, "note": "start"},
                 {"action": data["action"], "time": dt1.strftime("%Y-%m-%d %H:%M:%S"), "user": uid, "note": "end"},
-            ])
-            save_data(LOG_FILE, trim_old(log))
+            )
             user_states.pop(uid)
             return await update.message.reply_text("✅ Длительность записана.", reply_markup=MAIN_MENU)
 
@@ -526,8 +410,7 @@ async def handle_message(update:Update, context:ContextTypes.DEFAULT_TYPE):
             choice = text
             entry = data["entries"][data["idx"]]
             if choice == "3":
-                log2 = [e for e in log if not (e["action"] == entry["action"] and e["time"] == entry["time"])]
-                save_data(LOG_FILE, trim_old(log2))
+                rewrite_log(lambda log: trim_old([e for e in log if not (e["action"] == entry["action"] and e["time"] == entry["time"])]))
                 user_states.pop(uid)
                 return await update.message.reply_text("✅ Удалено.", reply_markup=MAIN_MENU)
             if choice in ("1","2"):
@@ -549,12 +432,12 @@ async def handle_message(update:Update, context:ContextTypes.DEFAULT_TYPE):
             except:
                 user_states.pop(uid)
                 return await update.message.reply_text("Неверный формат.", reply_markup=MAIN_MENU)
-            new_log = []
-            for e in log:
-                if e["action"] == entry["action"] and e["time"] == entry["time"] and e.get("note","") == field:
-                    e["time"] = dt_new
-                new_log.append(e)
-            save_data(LOG_FILE, trim_old(new_log))
+            def retime(log):
+                for e in log:
+                    if e["action"] == entry["action"] and e["time"] == entry["time"] and e.get("note","") == field:
+                        e["time"] = dt_new
+                return trim_old(log)
+            rewrite_log(retime)
             user_states.pop(uid)
             return await update.message.reply_text("✅ Обновлено.", reply_markup=MAIN_MENU)
 
@@ -563,7 +446,12 @@ async def handle_message(update:Update, context:ContextTypes.DEFAULT_TYPE):
         return await update.message.reply_text("Выберите период:", reply_markup=STATS_CHOICES)
     if text in ("2 дня","5 дней","10 дней"):
         days = int(text.split()[0])
-        return await update.message.reply_text(get_stats(log, days), reply_markup=MAIN_MENU)
+        return await update.message.reply_text(get_stats(log, days, settings["schedule"]), reply_markup=MAIN_MENU)
+    if text in ("🍽️ 2 дня","🍽️ 5 дней","🍽️ 10 дней"):
+        days = int(text.split()[1])
+        return await update.message.reply_text(get_meal_stats(log, days, settings["schedule"], log_gen), reply_markup=MAIN_MENU)
+    if text == "📈 Тренды":
+        return await update.message.reply_text(get_trends(log, log_gen), reply_markup=MAIN_MENU)
 
     # Последние записи
     if text == "🕓 Последние":
@@ -687,6 +575,10 @@ async def handle_message(update:Update, context:ContextTypes.DEFAULT_TYPE):
     # Фоллбек
     await update.message.reply_text("Выберите действие из меню.",reply_markup=MAIN_MENU)
 
+def register_handlers(app):
+    app.add_handler(CommandHandler("start", start))
+    app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message))
+
 def main():
     # Проверяем конфигурацию
     if not BOT_TOKEN or not ALLOWED_USER_IDS:
@@ -698,8 +590,7 @@ def main():
     app.job_queue.scheduler.configure(timezone=ZoneInfo("Europe/Belgrade"))
 
     # Регистрируем обработчики
-    app.add_handler(CommandHandler("start", start))
-    app.add_handler(MessageHandler(filters.TEXT & ~filters.COMMAND, handle_message))
+    register_handlers(app)
 
     # Планируем задания
     jq = app.job_queue
@@ -709,12 +600,8 @@ def main():
     jq.run_daily(send_backup, time=time(hour=23, minute=59, tzinfo=tz))
 
     # Напоминания о еде и прогулке
-    meal_order = ["breakfast", "lunch", "dinner", "late_dinner"]
-    sched = settings["schedule"]
-    n = settings.get("feedings_per_day", 1)
-
-    for key in meal_order[:n]:
-        hh, mm = map(int, sched[key].split(":"))
+    for key, hhmm in active_schedule(settings).items():
+        hh, mm = map(int, hhmm.split(":"))
         meal_time = time(hour=hh, minute=mm, tzinfo=tz)
 
         # За 5 минут до еды
@@ -0,0 +1,421 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Нагрузочный тест Bonita_Kani_Korso: десятки пользователей одновременно жмут кнопки.
+- Настоящий Application + handle_message, вместо Telegram — локальный фейковый Bot API
+  (getUpdates/sendMessage обслуживаются в том же процессе, без сети)
+- Сценарии: Сон/Прогулка/Игры (toggle), Туалет (улица/пеленка/мимо),
+  Редактирование (удаление туалета, перенос начала/конца сессии, отмена),
+  Статистика (2/5/10 дней, 🍽️, 📈)
+- Отчёт: пропускная способность, задержка ответа p50/p99, время блокировки event loop
+- Ответ засчитывается, только если бот отправил его в чат, обрабатывая ожидающий апдейт
+- Проверка: записи в логе (по времени) и открытые сессии совпадают с тем, что отправлено
+- Часы бота подменены монотонными (шаг CLOCK_STEP на сообщение), поэтому нажатия
+  одного пользователя не сливаются в одну секунду при любой нагрузке
+Работает во временной папке, рабочий лог не трогает. Код выхода 1 при расхождениях.
+    python bonita_loadtest.py --users 30 --actions 20 --think 0.05   # замкнутый режим
+    python bonita_loadtest.py --users 60 --ramp 10,20,40,80,160      # ступени, где растёт p99
+"""
+import os, re, sys, json, time, random, shutil, asyncio, argparse, tempfile, contextvars
+from datetime import datetime, timedelta
+from telegram.ext import ApplicationBuilder
+from telegram.request import BaseRequest
+
+REPLY_TIMEOUT = 10.0   # сек. без ответа — сообщение считается потерянным
+LAG_INTERVAL  = 0.005  # период проверки event loop
+LAG_THRESHOLD = 0.002  # задержка меньше этой не считается блокировкой
+CLOCK_STEP    = timedelta(minutes=2)  # шаг фейковых часов бота на каждое сообщение
+DEGRADE_P99   = 2.0    # p99 выше базового (первая ступень) в столько раз — деградация
+
+TOGGLES = [("🛌 Сон","Сон"),("🌳 Прогулка","Прогулка"),("🌿 Игры","Игры")]
+TOILETS = [("💩 Туалет (какашки)","Туалет (какашки)"),("🚰 Туалет (мочи)","Туалет (мочи)")]
+STATS   = ["2 дня","5 дней","10 дней","🍽️ 2 дня","🍽️ 10 дней","📈 Тренды"]
+EDIT_ACTIONS = ["Сон","Прогулка","Игры","Туалет (какашки)","Туалет (мочи)"]
+TIME_FMT     = "%Y-%m-%d %H:%M:%S"
+ENTRY_RE     = re.compile(r"^(\d+)\. (\S+ \S+) \((.*)\)$",re.M)  # строка списка в «✏️ Редактировать»
+
+# update_id апдейта, который сейчас обрабатывает handle_message (см. track_update)
+CURRENT = contextvars.ContextVar("update_id")
+
+def track_update(handler):
+    async def wrapper(update, context):
+        token=CURRENT.set(update.update_id)
+        try:
+            return await handler(update,context)
+        finally:
+            CURRENT.reset(token)
+    return wrapper
+
+# --- Фейковый Bot API ---
+class FakeBotAPI:
+    """Состояние «сервера»: очередь апдейтов для getUpdates и ожидающие ответа чаты."""
+    def __init__(self):
+        self.updates=asyncio.Queue()
+        self.waiters={}   # chat_id -> (update_id, Future ответа)
+        self.next_id=1
+        self.sent=0
+        self.unsolicited=0  # sendMessage не в ответ на ожидающий апдейт (алерты и т.п.)
+
+    def push(self, uid, text):
+        n=self.next_id; self.next_id+=1
+        fut=asyncio.get_running_loop().create_future()
+        self.waiters[uid]=(n,fut)
+        user={"id":uid,"is_bot":False,"first_name":f"user{uid}"}
+        self.updates.put_nowait({"update_id":n,"message":{
+            "message_id":n,"date":int(time.time()),"chat":{"id":uid,"type":"private"},
+            "from":user,"text":text}})
+        return n,fut
+
+    async def get_updates(self, params):
+        timeout=min(float(params.get("timeout") or 0),1.0)
+        try:
+            res=[await asyncio.wait_for(self.updates.get(),timeout or 0.01)]
+        except asyncio.TimeoutError:
+            return []
+        while not self.updates.empty(): res.append(self.updates.get_nowait())
+        return res
+
+    def reply(self, params):
+        """Ответом считается только сообщение в чат, отправленное при обработке
+        его ожидающего апдейта; остальное (алерты всем пользователям) — не ответ."""
+        self.sent+=1
+        chat_id=int(params["chat_id"])
+        n,fut=self.waiters.get(chat_id,(None,None))
+        if fut is not None and n==CURRENT.get(None) and not fut.done():
+            del self.waiters[chat_id]
+            fut.set_result((time.perf_counter(),params.get("text","")))
+        else:
+            self.unsolicited+=1
+        return {"message_id":self.sent,"date":int(time.time()),
+                "chat":{"id":chat_id,"type":"private"},"text":params.get("text","")}
+
+    async def call(self, method, params):
+        if method=="getMe":
+            return {"id":1,"is_bot":True,"first_name":"Fake","username":"fake_bonita_bot"}
+        if method=="getUpdates":
+            return await self.get_updates(params)
+        if method in ("sendMessage","sendDocument"):
+            return self.reply(params)
+        return True  # deleteWebhook, setMyCommands и т.п.
+
+class FakeRequest(BaseRequest):
+    def __init__(self, api):
+        self.api=api
+
+    async def initialize(self): pass
+    async def shutdown(self): pass
+
+    @property
+    def read_timeout(self):
+        return REPLY_TIMEOUT
+
+    async def do_request(self, url, method, request_data=None, read_timeout=None,
+                         write_timeout=None, connect_timeout=None, pool_timeout=None):
+        params=request_data.parameters if request_data else {}
+        result=await self.api.call(url.rsplit("/",1)[-1],params)
+        return 200, json.dumps({"ok":True,"result":result}).encode()
+
+# --- Часы бота ---
+class FakeClock:
+    """Монотонное время для handle_message: каждый вызов now() — на CLOCK_STEP позже.
+    В логе время с точностью до секунды; с настоящими часами быстрые нажатия одного
+    пользователя попадали бы в одну секунду и ломали toggle и проверку лога.
+    Так у каждой записи своё время, и по нему её можно найти (в том числе после
+    удаления или переноса через «✏️ Редактировать»)."""
+    def __init__(self):
+        self.t=datetime.now().replace(second=0,microsecond=0)
+        self.issued=set()     # все выданные времена
+        self.by_update={}     # update_id -> время, выданное при его обработке
+
+    def now(self):
+        self.t+=CLOCK_STEP
+        s=self.t.strftime(TIME_FMT); self.issued.add(s)
+        n=CURRENT.get(None)
+        if n is not None: self.by_update[n]=s
+        return self.t
+
+def fake_datetime(clock):
+    class FakeDatetime(datetime):
+        @classmethod
+        def now(cls, tz=None):
+            return clock.now()
+    return FakeDatetime
+
+# --- Пользователи ---
+class Expected:
+    """Что должно оказаться в логе после теста."""
+    def __init__(self):
+        self.entries={}  # время -> (uid, action, note)
+        self.open={}     # (uid, action) -> сессия открыта
+
+    def add(self, t, uid, action, note):
+        self.entries[t]=(uid,action,note)
+
+    def toggle(self, t, uid, action):
+        is_open=self.open.get((uid,action),False)
+        self.add(t,uid,action,"end" if is_open else "start")
+        self.open[(uid,action)]=not is_open
+
+    # удаление/перенос одной записи могут прийти от двух пользователей сразу —
+    # второй раз бот ничего не находит, и здесь это тоже no-op
+    def delete(self, t):
+        self.entries.pop(t,None)
+
+    def retime(self, t, new):
+        if t in self.entries: self.entries[new]=self.entries.pop(t)
+
+# Сценарий — генератор: отдаёт текст нажатия, получает текст ответа бота.
+def flow_toggle(u):
+    btn,act=u.rnd.choice(TOGGLES)
+    yield btn
+    u.expected.toggle(u.last,u.uid,act)
+
+def flow_toilet(u):
+    btn,act=u.rnd.choice(TOILETS)
+    where=u.rnd.choice([("Улица",),("Дом","Пеленка"),("Дом","Мимо")])
+    yield btn
+    for text in where: yield text
+    u.expected.add(u.last,u.uid,act,{"Улица":"outside","Пеленка":"home-pad","Мимо":"home-miss"}[where[-1]])
+
+def flow_edit(u):
+    """Туалет — удаление записи; Сон/Прогулка/Игры — перенос начала или конца на минуту
+    раньше (удалять их нельзя: сломается чередование start/end). Иногда — отмена."""
+    act=u.rnd.choice(EDIT_ACTIONS)
+    yield "✏️ Редактировать"
+    reply=yield act
+    rows=ENTRY_RE.findall(reply)
+    if not rows: return  # «Нет записей для редактирования»
+    session=act in dict(TOGGLES).values()
+    # переносим только записи с временем часов: перенесённое время (с нечётной минутой)
+    # при повторном переносе могло бы совпасть со временем другой записи
+    if session: rows=[r for r in rows if r[1] in u.clock.issued]
+    if not rows or u.rnd.random()<0.2:
+        yield u.cancel; return
+    i,t,note=u.rnd.choice(rows)
+    yield i
+    if session:
+        new=datetime.strptime(t,TIME_FMT)-timedelta(minutes=1)
+        yield "1" if note=="start" else "2"
+        reply=yield new.strftime("%d.%m.%Y %H:%M")
+        if reply=="✅ Обновлено.": u.expected.retime(t,new.strftime(TIME_FMT))
+    else:
+        reply=yield "3"
+        if reply=="✅ Удалено.": u.expected.delete(t)
+
+def flow_stats(u):
+    yield "📊 Статистика"
+    yield u.rnd.choice(STATS)
+
+FLOWS = [(0.4,"toggle",flow_toggle),(0.3,"toilet",flow_toilet),(0.15,"edit",flow_edit),(0.15,"stats",flow_stats)]
+
+class SimUser:
+    def __init__(self, uid, seed, expected, clock, cancel):
+        self.uid=uid; self.rnd=random.Random(seed*100003+uid)
+        self.expected=expected; self.clock=clock; self.cancel=cancel
+        self.flow=None; self.text=None; self.busy=False; self.done=0
+        self.last=None  # время, которое бот выдал последнему нажатию
+
+    def next_text(self):
+        """Следующее нажатие (начинает новый сценарий, если прошлый закончен)."""
+        if self.text is None:
+            r=self.rnd.random()
+            for w,name,fn in FLOWS:
+                if r<w: break
+                r-=w
+            self.flow=fn(self); self.name=name
+            self.text=next(self.flow)
+        return self.text
+
+    def on_reply(self, reply):
+        try:
+            self.text=self.flow.send(reply)
+        except StopIteration:
+            self.text=None; self.done+=1
+
+    async def tap(self, api, step):
+        """Одно нажатие: отправить, дождаться ответа, записать задержку в step."""
+        self.busy=True
+        text=self.next_text()
+        t0=time.perf_counter()
+        step["messages"]+=1
+        try:
+            n,fut=api.push(self.uid,text)
+            t1,reply=await asyncio.wait_for(fut,REPLY_TIMEOUT)
+            step["latency"].append(t1-t0)
+            self.last=self.clock.by_update.pop(n,None)
+            self.on_reply(reply)
+        except asyncio.TimeoutError:
+            step["timeouts"]+=1
+            self.text=None  # сценарий брошен — лог уже не сойдётся, тест провалится
+        self.busy=False
+
+def new_step(label):
+    return {"label":label,"latency":[],"timeouts":0,"messages":0,"skipped":0,
+            "blocked":0.0,"max_block":0.0,"t0":time.perf_counter(),"t1":None}
+
+async def closed_loop(api, users, args, cur):
+    """Каждый пользователь: пауза think → нажатие → ждёт ответа → ..."""
+    async def one(u):
+        while u.done<args.actions or u.text is not None:
+            await asyncio.sleep(u.rnd.uniform(args.think,args.think*1.5))
+            await u.tap(api,cur[0])
+    await asyncio.gather(*(one(u) for u in users))
+    cur[0]["t1"]=time.perf_counter()
+    return [cur[0]]
+
+async def open_loop(api, users, args, cur):
+    """Нажатия приходят пуассоновским потоком с заданной частотой, не дожидаясь ответов;
+    каждое отдаётся свободному пользователю. Все заняты — нажатие пропущено (насыщение)."""
+    rnd=random.Random(args.seed)
+    loop=asyncio.get_running_loop()
+    steps=[]; inflight=set()
+    for rate in args.ramp:
+        step=cur[0]=new_step(rate); steps.append(step)
+        t_end=loop.time()+args.step; t_next=loop.time()
+        while True:
+            t_next+=rnd.expovariate(rate)
+            if t_next>=t_end: break
+            await asyncio.sleep(max(0.0,t_next-loop.time()))
+            idle=[u for u in users if not u.busy]
+            if not idle:
+                step["skipped"]+=1; continue
+            task=asyncio.create_task(rnd.choice(idle).tap(api,step))
+            inflight.add(task); task.add_done_callback(inflight.discard)
+        await asyncio.sleep(max(0.0,t_end-loop.time()))
+        step["t1"]=time.perf_counter()
+    # дожимаем начатые сценарии, чтобы лог можно было сверить (в отчёт не входит)
+    cur[0]=new_step("drain")
+    while inflight or any(u.text is not None for u in users):
+        if inflight: await asyncio.gather(*inflight)
+        for u in users:
+            if u.text is not None and not u.busy:
+                t=asyncio.create_task(u.tap(api,cur[0])); inflight.add(t); t.add_done_callback(inflight.discard)
+        await asyncio.sleep(0)
+    return steps
+
+async def watch_loop(cur):
+    while True:
+        t0=time.perf_counter()
+        await asyncio.sleep(LAG_INTERVAL)
+        lag=time.perf_counter()-t0-LAG_INTERVAL
+        if lag>LAG_THRESHOLD:
+            cur[0]["blocked"]+=lag; cur[0]["max_block"]=max(cur[0]["max_block"],lag)
+
+# --- Проверка ---
+def check_log(log, expected):
+    problems=[]
+    got={}; last={}
+    for e in sorted(log,key=lambda x:x["time"]):
+        rec=(e["user"],e["action"],e.get("note"))
+        if e["time"] in got:
+            problems.append(f"{e['time']}: две записи {got[e['time']]} и {rec}"); continue
+        got[e["time"]]=rec
+        if e.get("note") in ("start","end"): last[(e["user"],e["action"])]=e["note"]=="start"
+    for t in sorted(set(got)|set(expected.entries)):
+        if got.get(t)!=expected.entries.get(t):
+            problems.append(f"{t}: в логе {got.get(t)}, ожидалось {expected.entries.get(t)}")
+    for k in sorted(set(last)|set(expected.open),key=str):
+        if last.get(k,False)!=expected.open.get(k,False):
+            problems.append(f"{k}: сессия {'открыта' if last.get(k) else 'закрыта'} в логе, ожидалось иначе")
+    return problems
+
+def percentile(arr, q):
+    if not arr: return 0.0
+    arr=sorted(arr)
+    return arr[min(len(arr)-1,int(round(q*(len(arr)-1))))]
+
+def print_step(step, head=""):
+    lat=step["latency"]; elapsed=max(step["t1"]-step["t0"],1e-9)
+    print(f"{head}📨 {step['messages']} сообщ. за {elapsed:.1f} с — {len(lat)/elapsed:.1f} ответов/с; "
+          f"p50 {percentile(lat,0.5)*1000:.1f} мс, p99 {percentile(lat,0.99)*1000:.1f} мс, "
+          f"макс {max(lat,default=0)*1000:.1f} мс; без ответа {step['timeouts']}"
+          +(f", пропущено {step['skipped']}" if step["skipped"] else ""))
+    print(f"{head}🧱 Блокировка event loop: {step['blocked']*1000:.0f} мс "
+          f"({step['blocked']/elapsed:.1%} времени), макс {step['max_block']*1000:.1f} мс")
+
+def degraded(step, base):
+    """Ступень считается деградировавшей: p99 вырос в DEGRADE_P99 раз относительно первой
+    ступени, есть пропуски (все пользователи ждут ответа) или потерянные ответы."""
+    return (percentile(step["latency"],0.99)>DEGRADE_P99*max(percentile(base["latency"],0.99),0.001)
+            or step["skipped"]>0 or step["timeouts"]>0)
+
+async def run(args):
+    import bonita_kani_korso as bot
+    clock=FakeClock()
+    bot.datetime=fake_datetime(clock)
+    bot.handle_message=track_update(bot.handle_message)  # до register_handlers
+    uids=list(range(100001,100001+args.users))
+    bot.ALLOWED_USER_IDS[:]=uids
+
+    api=FakeBotAPI()
+    builder=(ApplicationBuilder().token("123456:FAKE")
+             .request(FakeRequest(api)).get_updates_request(FakeRequest(api)))
+    if args.concurrent: builder=builder.concurrent_updates(True)
+    app=builder.build()
+    bot.register_handlers(app)
+
+    expected=Expected()
+    users=[SimUser(uid,args.seed,expected,clock,bot.CANCEL) for uid in uids]
+    cur=[new_step("closed")]
+    async with app:
+        await app.updater.start_polling(poll_interval=0.0,timeout=1)
+        await app.start()
+        watcher=asyncio.create_task(watch_loop(cur))
+        steps=await (open_loop if args.ramp else closed_loop)(api,users,args,cur)
+        watcher.cancel()
+        await app.updater.stop()
+        await app.stop()
+
+    print(f"👥 Пользователей: {args.users}, сценариев: {sum(u.done for u in users)}, "
+          f"прочих сообщений бота (алерты): {api.unsolicited}")
+    failed=any(st["timeouts"] for st in steps)
+    if args.ramp:
+        knee=None
+        for st in steps:
+            bad=st is not steps[0] and degraded(st,steps[0])
+            if bad and knee is None: knee=st["label"]
+            print(f"— {st['label']:g} сообщ./с{' ⚠️' if bad else ''}")
+            print_step(st,"  ")
+        print(f"📉 p99 деградирует с ~{knee:g} сообщ./с" if knee is not None
+              else f"📈 Деградации до {steps[-1]['label']:g} сообщ./с нет")
+    else:
+        print_step(steps[0])
+
+    log=bot.load_data(bot.LOG_FILE,[])
+    problems=check_log(log,expected)
+    sent=len(expected.entries)
+    opened=sum(expected.open.values())
+    if problems or failed:
+        print(f"❌ Расхождения (событий в логе {len(log)}, отправлено {sent}):")
+        for p in problems: print(f"  • {p}")
+        return 1
+    print(f"✅ Лог согласован: {len(log)} событий, открытых сессий {opened}")
+    return 0
+
+def main(argv=None):
+    ap=argparse.ArgumentParser(prog="bonita_loadtest",description="Нагрузочный тест бота с фейковым Bot API")
+    ap.add_argument("--users",type=int,default=30)
+    ap.add_argument("--actions",type=int,default=20,help="сценариев на пользователя (замкнутый режим)")
+    ap.add_argument("--think",type=float,default=0.2,help="мин. пауза между нажатиями, сек (замкнутый режим)")
+    ap.add_argument("--rate",type=float,help="открытый режим: нажатий в секунду")
+    ap.add_argument("--ramp",type=lambda v:[float(x) for x in v.split(",")],
+                    help="открытый режим со ступенями частоты, например 10,20,40,80,160")
+    ap.add_argument("--step",type=float,default=10.0,help="длительность ступени открытого режима, сек")
+    ap.add_argument("--seed",type=int,default=1)
+    ap.add_argument("--concurrent",action="store_true",help="concurrent_updates(True) вместо последовательной обработки")
+    ap.add_argument("--keep",action="store_true",help="не удалять временную папку с логом")
+    args=ap.parse_args(argv)
+    if args.rate and not args.ramp: args.ramp=[args.rate]
+
+    # бот читает/пишет файлы относительно текущей папки — уводим его во временную
+    sys.path.insert(0,os.path.dirname(os.path.abspath(__file__)))
+    tmp=tempfile.mkdtemp(prefix="bonita_load_")
+    os.chdir(tmp)
+    try:
+        return asyncio.run(run(args))
+    finally:
+        if args.keep: print(f"📁 {tmp}")
+        else: shutil.rmtree(tmp,ignore_errors=True)
+
+if __name__=="__main__":
+    sys.exit(main())
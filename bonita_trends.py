@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+Тренды Bonita_Kani_Korso — скользящие окна 1/7/30 дней без полного прохода по логу:
+- Туалет: доля «улица» / «пеленка» / «мимо» по каждому действию
+- Сон: сумма за сутки (в среднем по окну)
+- Еда: сдвиг фактического времени кормления относительно расписания
+- Алерты: правила над окнами (например, доля «мимо» выросла вдвое за неделю)
+Каждое новое событие обрабатывается за O(1); лог читается только с хвоста.
+"""
+from collections import deque
+from datetime import datetime, timedelta
+from bonita_core import LogCursor, SESSION_ACTIONS
+
+TIME_FMT       = "%Y-%m-%d %H:%M:%S"
+WINDOWS        = (1, 7, 30)
+TOILET_ACTIONS = [("💩","Туалет (какашки)"),("🚰","Туалет (мочи)")]
+TOILET_NOTES   = [("outside","улица"),("home-pad","пеленка"),("home-miss","мимо")]
+MIN_ALERT_EVENTS = 5  # меньше событий за неделю — алерты не считаем
+
+# --- Скользящее окно ---
+class Rolling:
+    """Сумма и количество значений за последние `days` суток."""
+    def __init__(self, days):
+        self.span=timedelta(days=days); self.q=deque(); self.total=0; self.count=0
+
+    def push(self, t, value=1):
+        self.q.append((t,value)); self.total+=value; self.count+=1
+
+    def expire(self, now):
+        cut=now-self.span
+        while self.q and self.q[0][0]<cut:
+            _,v=self.q.popleft(); self.total-=v; self.count-=1
+
+def schedule_drift(t, schedule):
+    """Минуты от ближайшего времени по расписанию (+ позже, − раньше).
+    schedule — только активные приёмы пищи (см. bonita_core.active_schedule)."""
+    best=None
+    for v in schedule.values():
+        hh,mm=map(int,v.split(":"))
+        for shift in (-1,0,1):
+            s=datetime.combine(t.date()+timedelta(days=shift),datetime.min.time()).replace(hour=hh,minute=mm)
+            d=int((t-s).total_seconds()//60)
+            if best is None or abs(d)<abs(best): best=d
+    return best
+
+# --- Тренды ---
+class Trends:
+    # окно 14 дней нужно только для сравнения «эта неделя / прошлая»
+    SPANS=WINDOWS+(14,)
+
+    def __init__(self):
+        self.cursor=LogCursor()
+        self.fired=set()
+        self.reset(None)
+
+    def reset(self, schedule):
+        self.schedule=dict(schedule) if schedule else None
+        self.cursor.reset()
+        self.win={}     # (ключ, дни) -> Rolling
+        self.open={}    # (user, action) -> datetime начала незакрытой сессии
+
+    def _push(self, key, t, value=1):
+        for d in self.SPANS:
+            w=self.win.get((key,d))
+            if w is None: w=self.win[(key,d)]=Rolling(d)
+            w.push(t,value); w.expire(t)
+
+    def _get(self, key, days, now=None):
+        w=self.win.get((key,days))
+        if w is None: return 0,0
+        w.expire(now or datetime.now())
+        return w.count,w.total
+
+    def feed(self, e):
+        t=datetime.strptime(e["time"],TIME_FMT)
+        act=e["action"]; note=e.get("note")
+        if act in SESSION_ACTIONS and note=="start":
+            self.open[(e.get("user"),act)]=t
+        elif act in SESSION_ACTIONS and note=="end":
+            t0=self.open.pop((e.get("user"),act),None)
+            if t0 is not None and act=="Сон":
+                self._push("sleep",t,int((t-t0).total_seconds()//60))
+        elif act=="Еда" and self.schedule:
+            self._push("drift",t,schedule_drift(t,self.schedule))
+        elif note in dict(TOILET_NOTES):
+            self._push(("toilet",act,note),t)
+            self._push(("toilet",act),t)
+
+    def update(self, log, schedule, gen=0):
+        fresh=self.cursor.fresh(log,gen)
+        if fresh is None or schedule!=self.schedule:
+            self.reset(schedule)
+            fresh=sorted(log,key=lambda x:x["time"])
+        for e in fresh: self.feed(e)
+        self.cursor.advance(log,fresh,gen)
+
+    # --- Метрики ---
+    def toilet_rate(self, action, note, days, now=None):
+        n,_=self._get(("toilet",action),days,now)
+        if not n: return None
+        return self._get(("toilet",action,note),days,now)[0]/n
+
+    def toilet_rate_prev_week(self, action, note, now=None):
+        n14,_=self._get(("toilet",action),14,now); n7,_=self._get(("toilet",action),7,now)
+        if n14==n7: return None
+        k14,_=self._get(("toilet",action,note),14,now); k7,_=self._get(("toilet",action,note),7,now)
+        return (k14-k7)/(n14-n7)
+
+    def sleep_per_day(self, days, now=None):
+        return self._get("sleep",days,now)[1]/days
+
+    def feeding_drift(self, days, now=None):
+        n,tot=self._get("drift",days,now)
+        return tot/n if n else None
+
+    def report(self, now=None):
+        now=now or datetime.now()
+        lines=["📈 Тренды (1 / 7 / 30 дн.):"]
+        for emoji,act in TOILET_ACTIONS:
+            lines.append(f"\n{emoji} {act}:")
+            for note,label in TOILET_NOTES:
+                vals=[self.toilet_rate(act,note,d,now) for d in WINDOWS]
+                lines.append(f"  • {label}: "+" / ".join("—" if v is None else f"{v:.0%}" for v in vals))
+        vals=[self.sleep_per_day(d,now) for d in WINDOWS]
+        lines.append("\n🛌 Сон в сутки: "+" / ".join(f"{int(v)//60}ч {int(v)%60}м" for v in vals))
+        vals=[self.feeding_drift(d,now) for d in WINDOWS]
+        lines.append("🍽️ Сдвиг еды от расписания: "+" / ".join("—" if v is None else f"{v:+.0f} мин" for v in vals))
+        return "\n".join(lines)
+
+    def alerts(self, now=None):
+        """Новые срабатывания правил ALERT_RULES (каждое — не чаще раза в сутки)."""
+        now=now or datetime.now()
+        out=[]
+        for rule in ALERT_RULES:
+            for key,text in rule(self,now):
+                if (key,now.date()) in self.fired: continue
+                self.fired.add((key,now.date()))
+                out.append(text)
+        return out
+
+# --- Правила алертов ---
+# Правило: (trends, now) -> список (ключ, текст). Подключается декоратором alert_rule.
+ALERT_RULES=[]
+
+def alert_rule(fn):
+    ALERT_RULES.append(fn)
+    return fn
+
+@alert_rule
+def miss_rate_doubled(tr, now):
+    res=[]
+    for emoji,act in TOILET_ACTIONS:
+        if tr._get(("toilet",act),7,now)[0]<MIN_ALERT_EVENTS: continue
+        cur=tr.toilet_rate(act,"home-miss",7,now)
+        prev=tr.toilet_rate_prev_week(act,"home-miss",now)
+        if prev and cur>=2*prev:
+            res.append((("miss",act),f"⚠️ {emoji} {act}: «мимо» {cur:.0%} за неделю против {prev:.0%} неделей ранее."))
+    return res